@@ -1,19 +1,22 @@
 import numpy as np
 import matplotlib.pyplot as plt
 import matplotlib.animation as animation
-from matplotlib.patches import Rectangle, Circle, FancyBboxPatch
+from matplotlib.patches import Rectangle, Circle, FancyBboxPatch, Wedge
+from matplotlib.colors import to_rgba_array
 from matplotlib.widgets import Button, Slider
 import tkinter as tk
 from tkinter import ttk, messagebox
 import threading
 import queue
 import time
+from collections import deque
 from datetime import datetime, timedelta
 from dataclasses import dataclass
 from typing import List, Tuple, Dict, Optional
 from enum import Enum
-import random
 import heapq
+import itertools
+import math
 
 # Import the core AMR classes from previous code
 class RobotStatus(Enum):
@@ -23,19 +26,28 @@ class RobotStatus(Enum):
     CHARGING = "charging"
     MAINTENANCE = "maintenance"
 
+# Integer codes used for RobotStatus in the fleet's status array
+ROBOT_STATUSES = list(RobotStatus)
+STATUS_CODES = {status: code for code, status in enumerate(ROBOT_STATUSES)}
+IDLE, MOVING, WORKING, CHARGING, MAINTENANCE = range(len(ROBOT_STATUSES))
+
 class TaskType(Enum):
     PICKUP = "pickup"
     DELIVERY = "delivery"
     INSPECTION = "inspection"
     CLEANING = "cleaning"
 
-@dataclass
+TASK_TYPES = list(TaskType)
+
+@dataclass(frozen=True)
 class Position:
+    """Immutable point; build a new Position instead of assigning x or y"""
+    __slots__ = ('x', 'y')
     x: float
     y: float
     
     def distance_to(self, other: 'Position') -> float:
-        return np.sqrt((self.x - other.x)**2 + (self.y - other.y)**2)
+        return math.hypot(self.x - other.x, self.y - other.y)
 
 @dataclass
 class Task:
@@ -52,8 +64,61 @@ class Task:
         if self.created_time is None:
             self.created_time = datetime.now()
 
+class FleetState:
+    """Struct-of-arrays storage for per-robot simulation state"""
+    FIELDS = ('pos_x', 'pos_y', 'battery', 'max_battery', 'speed', 'status',
+              'target_x', 'target_y', 'tasks_completed', 'distance')
+    
+    def __init__(self, size: int = 0):
+        self.pos_x = np.zeros(size)
+        self.pos_y = np.zeros(size)
+        self.battery = np.zeros(size)
+        self.max_battery = np.zeros(size)
+        self.speed = np.zeros(size)
+        self.status = np.zeros(size, dtype=np.int8)
+        # NaN marks "no target"
+        self.target_x = np.full(size, np.nan)
+        self.target_y = np.full(size, np.nan)
+        self.tasks_completed = np.zeros(size, dtype=np.int64)
+        self.distance = np.zeros(size)
+        
+    def __len__(self) -> int:
+        return len(self.pos_x)
+        
+    def append(self, other: 'FleetState', index: int) -> int:
+        """Copy slot `index` of another state onto the end of this one and return its new index"""
+        for name in self.FIELDS:
+            column = getattr(other, name)[index:index + 1]
+            setattr(self, name, np.append(getattr(self, name), column))
+        return len(self) - 1
+
+def _column(name: str, cast=float) -> property:
+    def fget(self):
+        return cast(getattr(self._state, name)[self._index])
+    
+    def fset(self, value):
+        getattr(self._state, name)[self._index] = value
+    
+    return property(fget, fset)
+
 class Robot:
+    """View of one robot's slot in a FleetState.
+    
+    A standalone robot owns a single-slot state; once added to an
+    AMRFleetManager it reads and writes the fleet's shared arrays.
+    `position` and `target_position` return immutable Position snapshots,
+    so move a robot by assigning a new Position to them.
+    """
+    battery_level = _column('battery')
+    max_battery = _column('max_battery')
+    speed = _column('speed')
+    total_distance_traveled = _column('distance')
+    tasks_completed = _column('tasks_completed', int)
+    
     def __init__(self, robot_id: str, initial_pos: Position, max_battery: float = 100.0):
+        self._state = FleetState(1)
+        self._index = 0
+        
         self.id = robot_id
         self.position = initial_pos
         self.status = RobotStatus.IDLE
@@ -65,24 +130,63 @@ class Robot:
         self.total_distance_traveled = 0.0
         self.tasks_completed = 0
         self.last_maintenance = datetime.now()
-        self.target_position: Optional[Position] = None
+        self.target_position = None
+        
+    def attach(self, state: FleetState):
+        """Move this robot's state into `state` and view it from there"""
+        self._index = state.append(self._state, self._index)
+        self._state = state
+        
+    @property
+    def position(self) -> Position:
+        return Position(float(self._state.pos_x[self._index]), float(self._state.pos_y[self._index]))
+    
+    @position.setter
+    def position(self, pos: Position):
+        self._state.pos_x[self._index] = pos.x
+        self._state.pos_y[self._index] = pos.y
+        
+    @property
+    def status(self) -> RobotStatus:
+        return ROBOT_STATUSES[self._state.status[self._index]]
+    
+    @status.setter
+    def status(self, status: RobotStatus):
+        self._state.status[self._index] = STATUS_CODES[status]
+        
+    @property
+    def target_position(self) -> Optional[Position]:
+        x = self._state.target_x[self._index]
+        if math.isnan(x):
+            return None
+        return Position(float(x), float(self._state.target_y[self._index]))
+    
+    @target_position.setter
+    def target_position(self, pos: Optional[Position]):
+        if pos is None:
+            self._state.target_x[self._index] = np.nan
+            self._state.target_y[self._index] = np.nan
+        else:
+            self._state.target_x[self._index] = pos.x
+            self._state.target_y[self._index] = pos.y
         
     def move_towards_target(self, target: Position, dt: float) -> bool:
         if self.battery_level <= 5:
             self.status = RobotStatus.CHARGING
             return False
             
-        distance = self.position.distance_to(target)
+        position = self.position
+        distance = position.distance_to(target)
         if distance < 0.5:
             self.position = Position(target.x, target.y)
             return True
             
         move_distance = min(self.speed * dt, distance)
-        direction_x = (target.x - self.position.x) / distance
-        direction_y = (target.y - self.position.y) / distance
+        direction_x = (target.x - position.x) / distance
+        direction_y = (target.y - position.y) / distance
         
-        self.position.x += direction_x * move_distance
-        self.position.y += direction_y * move_distance
+        self.position = Position(position.x + direction_x * move_distance,
+                                 position.y + direction_y * move_distance)
         
         self.total_distance_traveled += move_distance
         self.battery_level = max(0, self.battery_level - move_distance * 0.1)
@@ -109,149 +213,377 @@ class PathPlanner:
         self.obstacles = set(obstacles) if obstacles else set()
 
 class TaskScheduler:
-    def __init__(self):
-        self.pending_tasks: List[Task] = []
+    def __init__(self, stable_matching: bool = True):
+        # Batch assignment used by the fleet: stable matching, or the cheaper greedy pass
+        self.stable_matching = stable_matching
+        # Binary heap of (-priority, insertion order, task) entries
+        self.pending_tasks: List[Tuple[int, int, Task]] = []
+        self._counter = itertools.count()
+        # Buffers for the cost matrix; the small robot buffers are refilled on
+        # every call, the task buffer only when the pending set changes
+        self.robot_xy = np.empty((0, 2), dtype=np.float64)
+        self.robot_battery = np.empty(0, dtype=np.float64)
+        self.task_xy = np.empty((0, 2), dtype=np.float64)
+        self._tasks_changed = True
         
     def add_task(self, task: Task):
-        self.pending_tasks.append(task)
-        self.pending_tasks.sort(key=lambda t: t.priority, reverse=True)
-        
-    def assign_optimal_robot(self, robots: List[Robot]) -> Optional[Tuple[Robot, Task]]:
+        heapq.heappush(self.pending_tasks, (-task.priority, next(self._counter), task))
+        self._tasks_changed = True
+        
+    def get_pending_tasks(self) -> List[Task]:
+        """Unassigned tasks, in heap (not priority) order"""
+        return [task for _, _, task in self.pending_tasks]
+        
+    def _refresh_buffers(self, robots: List[Robot]):
+        # Robots can move between calls while keeping the same idle set (e.g. an
+        # emergency stop right after an assignment), so never reuse these
+        self.robot_xy = np.array([(r.position.x, r.position.y) for r in robots],
+                                 dtype=np.float64).reshape(-1, 2)
+        self.robot_battery = np.array([r.battery_level for r in robots], dtype=np.float64)
+        
+        if self._tasks_changed:
+            self.task_xy = np.array([(t.start_pos.x, t.start_pos.y) for _, _, t in self.pending_tasks],
+                                    dtype=np.float64).reshape(-1, 2)
+            self._tasks_changed = False
+        
+    def _score_matrix(self, robots: List[Robot]) -> Tuple[List[Robot], Optional[np.ndarray]]:
+        """Robots free to take work and their (robot, task) cost matrix"""
         if not self.pending_tasks:
-            return None
+            return [], None
             
         available_robots = [r for r in robots if r.status == RobotStatus.IDLE and r.battery_level > 20]
         if not available_robots:
+            return [], None
+        
+        self._refresh_buffers(available_robots)
+        
+        # Score every (robot, task) pair at once: distance plus battery penalty
+        diff = self.robot_xy[:, None, :] - self.task_xy[None, :, :]
+        dist = np.sqrt(np.einsum('rtk,rtk->rt', diff, diff))
+        score = dist + ((100 - self.robot_battery[:, None]) * 0.1)
+        return available_robots, score
+        
+    def _take_tasks(self, indices: List[int]) -> List[Task]:
+        """Remove the entries at the given heap positions and return their tasks"""
+        tasks = [self.pending_tasks[i][-1] for i in indices]
+        taken = set(indices)
+        # Every task was scored, so the heap order is irrelevant until removal
+        self.pending_tasks[:] = [entry for i, entry in enumerate(self.pending_tasks) if i not in taken]
+        heapq.heapify(self.pending_tasks)
+        self._tasks_changed = True
+        return tasks
+        
+    def assign_optimal_robot(self, robots: List[Robot]) -> Optional[Tuple[Robot, Task]]:
+        available_robots, score = self._score_matrix(robots)
+        if score is None:
             return None
+        
+        r, t = np.unravel_index(np.argmin(score), score.shape)
+        return available_robots[r], self._take_tasks([t])[0]
+        
+    def assign_all(self, robots: List[Robot]) -> List[Tuple[Robot, Task]]:
+        """Stable matching of pending tasks to all available robots.
+        
+        Tasks propose to robots in order of increasing cost (Gale-Shapley); a
+        robot holds the cheapest proposal so far. Unmatched tasks stay queued.
+        """
+        available_robots, score = self._score_matrix(robots)
+        if score is None:
+            return []
+        
+        n_robots, n_tasks = score.shape
+        preferences = np.argsort(score, axis=0, kind='stable').T.tolist()
+        cost = score.tolist()
+        next_choice = [0] * n_tasks
+        held: List[Optional[int]] = [None] * n_robots
+        free = deque(range(n_tasks))
+        
+        while free:
+            t = free.popleft()
+            if next_choice[t] == n_robots:
+                continue  # Rejected by every robot
+            r = preferences[t][next_choice[t]]
+            next_choice[t] += 1
             
-        best_assignment = None
-        best_score = float('inf')
-        
-        for task in self.pending_tasks:
-            for robot in available_robots:
-                distance = robot.position.distance_to(task.start_pos)
-                battery_penalty = (100 - robot.battery_level) * 0.1
-                score = distance + battery_penalty
-                
-                if score < best_score:
-                    best_score = score
-                    best_assignment = (robot, task)
-        
-        if best_assignment:
-            robot, task = best_assignment
-            self.pending_tasks.remove(task)
-            return best_assignment
-        
-        return None
+            current = held[r]
+            if current is None:
+                held[r] = t
+            elif cost[r][t] < cost[r][current]:
+                held[r] = t
+                free.append(current)
+            else:
+                free.append(t)
+        
+        matches = [(r, t) for r, t in enumerate(held) if t is not None]
+        return self._take_matches(available_robots, matches)
+        
+    def assign_optimal_robot_batch(self, robots: List[Robot]) -> List[Tuple[Robot, Task]]:
+        """Greedy assignment of pending tasks to all available robots.
+        
+        Repeatedly takes the cheapest remaining (robot, task) pair and masks
+        its row and column; not necessarily stable, but all NumPy.
+        """
+        available_robots, score = self._score_matrix(robots)
+        if score is None:
+            return []
+        
+        n_tasks = score.shape[1]
+        matches = []
+        for _ in range(min(score.shape)):
+            r, t = divmod(int(score.argmin()), n_tasks)
+            matches.append((r, t))
+            score[r, :] = np.inf
+            score[:, t] = np.inf
+        
+        return self._take_matches(available_robots, matches)
+        
+    def _take_matches(self, robots: List[Robot], matches: List[Tuple[int, int]]) -> List[Tuple[Robot, Task]]:
+        """Dequeue the matched tasks and pair them with their robots"""
+        tasks = self._take_tasks([t for _, t in matches])
+        return [(robots[r], task) for (r, _), task in zip(matches, tasks)]
 
 class AMRFleetManager:
+    TASK_POOL_SIZE = 1024
+    
     def __init__(self, grid_width: int = 50, grid_height: int = 30):
         self.robots: List[Robot] = []
+        self.state = FleetState()
         self.task_scheduler = TaskScheduler()
         self.path_planner = PathPlanner(grid_width, grid_height)
         self.charging_stations = [Position(5, 5), Position(45, 5), Position(25, 25)]
+        self.station_xy = np.array([(s.x, s.y) for s in self.charging_stations], dtype=np.float64)
         self.grid_width = grid_width
         self.grid_height = grid_height
         self.total_tasks_completed = 0
         self.fleet_efficiency = 0.0
         self.simulation_running = False
+        # Robot-derived part of get_fleet_status(), reset whenever robots change
+        self._status_cache: Optional[Dict] = None
+        # Pre-drawn random task parameters, refilled in one batch when empty
+        self._rng = np.random.default_rng()
+        self._task_pool: List[Tuple] = []
+        # Other threads (the tkinter control panel) never touch fleet state
+        # directly: they queue commands, drained at the start of update_fleet,
+        # and read status snapshots published when they queue 'publish_status'
+        self.cmd_q: queue.Queue = queue.Queue()
+        self.status_q: queue.Queue = queue.Queue(maxsize=1)
+        self._commands = {
+            'add_random_task': self.add_random_task,
+            'emergency_stop': self.emergency_stop,
+            'charge_all': self.charge_all,
+            'publish_status': self._publish_status,
+        }
         
     def add_robot(self, robot: Robot):
+        robot.attach(self.state)
         self.robots.append(robot)
+        self._status_cache = None
+        
+    def add_random_task(self) -> Task:
+        task = self.generate_random_task()
+        self.task_scheduler.add_task(task)
+        return task
+        
+    def emergency_stop(self):
+        """Halt every robot and drop its current task"""
+        for robot in self.robots:
+            robot.current_task = None
+        self.state.status[:] = IDLE
+        self.state.target_x[:] = np.nan
+        self.state.target_y[:] = np.nan
+        self._status_cache = None
+        
+    def charge_all(self, threshold: float = 90):
+        """Send every robot below `threshold` battery to a charging station"""
+        low = self.state.battery < threshold
+        self.state.status[low] = CHARGING
+        self.state.target_x[low] = np.nan
+        self.state.target_y[low] = np.nan
+        self._status_cache = None
+        
+    def process_commands(self):
+        """Apply every command queued on cmd_q, in order"""
+        while True:
+            try:
+                name, *args = self.cmd_q.get_nowait()
+            except queue.Empty:
+                break
+            self._commands[name](*args)
+        
+    def _publish_status(self):
+        # The fleet summary plus plain per-robot values, so readers on other
+        # threads never need the live Robot objects
+        state = self.state
+        status = self.get_fleet_status()
+        status['robots'] = [{
+            'id': robot.id,
+            'status': ROBOT_STATUSES[state.status[i]].value,
+            'position': (float(state.pos_x[i]), float(state.pos_y[i])),
+            'battery': float(state.battery[i]),
+            'tasks_completed': int(state.tasks_completed[i]),
+            'distance': float(state.distance[i]),
+            'current_task': robot.current_task.id if robot.current_task else None,
+        } for i, robot in enumerate(self.robots)]
+        
+        # Keep only the newest snapshot
+        try:
+            self.status_q.get_nowait()
+        except queue.Empty:
+            pass
+        self.status_q.put_nowait(status)
+        
+    def _refill_task_pool(self):
+        n = self.TASK_POOL_SIZE
+        low = (2, 2, 2, 2)
+        high = (self.grid_width-2, self.grid_height-2, self.grid_width-2, self.grid_height-2)
+        coords = self._rng.uniform(low, high, size=(n, 4))
+        
+        self._task_pool = list(zip(
+            self._rng.integers(1000, 10000, size=n).tolist(),
+            self._rng.integers(0, len(TaskType), size=n).tolist(),
+            coords.tolist(),
+            self._rng.integers(1, 6, size=n).tolist(),
+            self._rng.uniform(5, 30, size=n).tolist()
+        ))
         
     def generate_random_task(self) -> Task:
-        task_types = list(TaskType)
-        start_pos = Position(
-            random.uniform(2, self.grid_width-2),
-            random.uniform(2, self.grid_height-2)
-        )
-        end_pos = Position(
-            random.uniform(2, self.grid_width-2),
-            random.uniform(2, self.grid_height-2)
-        )
+        if not self._task_pool:
+            self._refill_task_pool()
+        number, type_idx, (sx, sy, ex, ey), priority, duration = self._task_pool.pop()
         
         return Task(
-            id=f"T{random.randint(1000, 9999)}",
-            task_type=random.choice(task_types),
-            start_pos=start_pos,
-            end_pos=end_pos,
-            priority=random.randint(1, 5),
-            estimated_duration=random.uniform(5, 30)
+            id=f"T{number}",
+            task_type=TASK_TYPES[type_idx],
+            start_pos=Position(sx, sy),
+            end_pos=Position(ex, ey),
+            priority=priority,
+            estimated_duration=duration
         )
     
     def update_fleet(self, dt: float):
+        self.process_commands()
+        
         # Handle task assignments
-        assignment = self.task_scheduler.assign_optimal_robot(self.robots)
-        if assignment:
-            robot, task = assignment
+        scheduler = self.task_scheduler
+        if scheduler.stable_matching:
+            assignments = scheduler.assign_all(self.robots)
+        else:
+            assignments = scheduler.assign_optimal_robot_batch(self.robots)
+        for robot, task in assignments:
             robot.assign_task(task)
         
-        # Update each robot
-        for robot in self.robots:
-            if robot.status == RobotStatus.MOVING and robot.target_position:
-                if robot.move_towards_target(robot.target_position, dt):
-                    if robot.current_task:
-                        if robot.target_position == robot.current_task.start_pos:
-                            # Reached pickup point, now go to delivery
-                            robot.target_position = robot.current_task.end_pos
-                            robot.status = RobotStatus.WORKING
-                        else:
-                            # Completed delivery
-                            robot.complete_current_task()
+        state = self.state
+        status = state.status
+        
+        # Charging robots without a target head for the nearest station
+        seeking = (status == CHARGING) & np.isnan(state.target_x)
+        if seeking.any():
+            station_dist = np.hypot(state.pos_x[seeking, None] - self.station_xy[None, :, 0],
+                                    state.pos_y[seeking, None] - self.station_xy[None, :, 1])
+            nearest_station = station_dist.argmin(axis=1)
+            state.target_x[seeking] = self.station_xy[nearest_station, 0]
+            state.target_y[seeking] = self.station_xy[nearest_station, 1]
+        
+        # Advance every travelling robot in one vectorized step
+        travelling = ((status == MOVING) | (status == WORKING) | (status == CHARGING)) & ~np.isnan(state.target_x)
+        drained = travelling & (state.battery <= 5)
+        status[drained] = CHARGING
+        travelling &= ~drained
+        
+        # Branchless over the whole fleet: robots that are not travelling, or
+        # have just arrived, take a zero step; arrivals are snapped afterwards
+        dx = np.where(travelling, state.target_x - state.pos_x, 0.0)
+        dy = np.where(travelling, state.target_y - state.pos_y, 0.0)
+        dist = np.hypot(dx, dy)
+        reached = travelling & (dist < 0.5)
+        step = np.where(reached, 0.0, np.minimum(state.speed * dt, dist))
+        scale = step / np.maximum(dist, 1e-9)
+        
+        state.pos_x += dx * scale
+        state.pos_y += dy * scale
+        state.distance += step
+        state.battery -= step * 0.1
+        np.maximum(state.battery, 0, out=state.battery)
+        
+        np.copyto(state.pos_x, state.target_x, where=reached)
+        np.copyto(state.pos_y, state.target_y, where=reached)
+        arrived = np.flatnonzero(reached & (status != CHARGING))
+        
+        # At a charging station, charge battery
+        charged = reached & (status == CHARGING)
+        state.battery[charged] = np.minimum(state.max_battery[charged], state.battery[charged] + 20 * dt)
+        full = charged & (state.battery >= state.max_battery * 0.9)
+        status[full] = IDLE
+        state.target_x[full] = np.nan
+        state.target_y[full] = np.nan
+        
+        # Task transitions only touch the few robots that arrived this tick
+        for i in arrived:
+            robot = self.robots[i]
+            if status[i] == MOVING:
+                if robot.current_task:
+                    if robot.target_position == robot.current_task.start_pos:
+                        # Reached pickup point, now go to delivery
+                        robot.target_position = robot.current_task.end_pos
+                        robot.status = RobotStatus.WORKING
                     else:
-                        robot.status = RobotStatus.IDLE
-                        
-            elif robot.status == RobotStatus.WORKING and robot.target_position:
-                if robot.move_towards_target(robot.target_position, dt):
-                    robot.complete_current_task()
-                    
-            elif robot.status == RobotStatus.CHARGING:
-                # Find nearest charging station and move there
-                if not robot.target_position:
-                    nearest_station = min(self.charging_stations, 
-                                        key=lambda s: robot.position.distance_to(s))
-                    robot.target_position = nearest_station
-                
-                if robot.move_towards_target(robot.target_position, dt):
-                    # At charging station, charge battery
-                    robot.battery_level = min(robot.max_battery, robot.battery_level + 20 * dt)
-                    if robot.battery_level >= robot.max_battery * 0.9:
-                        robot.status = RobotStatus.IDLE
-                        robot.target_position = None
+                        # Completed delivery
+                        robot.complete_current_task()
+                else:
+                    robot.status = RobotStatus.IDLE
+            else:
+                robot.complete_current_task()
         
         # Update metrics
-        self.total_tasks_completed = sum(r.tasks_completed for r in self.robots)
-        active_robots = len([r for r in self.robots if r.status != RobotStatus.IDLE])
+        self.total_tasks_completed = int(state.tasks_completed.sum())
+        active_robots = int(np.count_nonzero(status != IDLE))
         self.fleet_efficiency = (active_robots / len(self.robots)) * 100 if self.robots else 0
+        self._status_cache = None
     
     def get_fleet_status(self) -> Dict:
-        status_counts = {}
-        for status in RobotStatus:
-            status_counts[status.value] = len([r for r in self.robots if r.status == status])
-        
-        return {
-            'total_robots': len(self.robots),
-            'status_distribution': status_counts,
-            'pending_tasks': len(self.task_scheduler.pending_tasks),
-            'total_tasks_completed': self.total_tasks_completed,
-            'fleet_efficiency': round(self.fleet_efficiency, 2),
-            'average_battery': round(np.mean([r.battery_level for r in self.robots]), 2) if self.robots else 0
-        }
+        """Summary of the fleet; a new dict on every call, built at most once per step"""
+        if self._status_cache is None:
+            counts = np.bincount(self.state.status, minlength=len(ROBOT_STATUSES))
+            status_counts = {status.value: int(count) for status, count in zip(ROBOT_STATUSES, counts)}
+            
+            self._status_cache = {
+                'total_robots': len(self.robots),
+                'status_distribution': status_counts,
+                'total_tasks_completed': self.total_tasks_completed,
+                'fleet_efficiency': round(self.fleet_efficiency, 2),
+                'average_battery': round(float(self.state.battery.mean()), 2) if self.robots else 0
+            }
+        
+        # Tasks can be queued between updates, so the pending count is always current
+        status = dict(self._status_cache, pending_tasks=len(self.task_scheduler.pending_tasks))
+        status['status_distribution'] = dict(status['status_distribution'])
+        return status
 
 class AMRDashboard:
+    # Physics steps at a fixed 10 Hz; rendering runs at 5 Hz
+    SIM_DT = 0.1
+    STEPS_PER_FRAME = 2
+    HISTORY_LENGTH = 100
+    
     def __init__(self):
         self.fleet_manager = AMRFleetManager()
         self.setup_fleet()
+        self.frame_time = self.SIM_DT * self.STEPS_PER_FRAME
         
         # Setup matplotlib figure
         self.fig, ((self.ax_main, self.ax_battery), (self.ax_status, self.ax_metrics)) = plt.subplots(2, 2, figsize=(16, 10))
         self.fig.suptitle('AMR Fleet Management Dashboard', fontsize=16, fontweight='bold')
         
-        # Data for plots
-        self.time_data = []
-        self.efficiency_data = []
+        # Data for plots; the metrics history drops its oldest sample automatically
+        self.time_data = deque(maxlen=self.HISTORY_LENGTH)
+        self.efficiency_data = deque(maxlen=self.HISTORY_LENGTH)
         self.battery_data = []
         self.task_data = []
+        self._last_status_counts = None
+        self._last_metrics = None
+        self._last_view = None
+        # Clean fleet-axes backgrounds saved while the fleet view is held
+        self._fleet_backgrounds = None
         
         # Colors for different robot statuses
         self.status_colors = {
@@ -261,13 +593,21 @@ class AMRDashboard:
             RobotStatus.CHARGING: 'red',
             RobotStatus.MAINTENANCE: 'purple'
         }
+        # The same colors as RGBA rows, indexed by the fleet's int status codes
+        self.status_rgba = to_rgba_array([self.status_colors[status] for status in ROBOT_STATUSES])
         
-        # Setup plots
+        # Setup plots and fix the layout once: blitting caches backgrounds for
+        # these positions, and running it before the control widgets exist
+        # keeps tight_layout to the subplot grid without warnings
         self.setup_plots()
+        self.fig.tight_layout()
+        # A full draw leaves out every animated artist
+        self.fig.canvas.mpl_connect('draw_event', self._on_full_draw)
         
-        # Animation
-        self.ani = animation.FuncAnimation(self.fig, self.update_dashboard, 
-                                         interval=100, blit=False, cache_frame_data=False)
+        # Animation; only the artists returned by update_dashboard are redrawn
+        self.ani = animation.FuncAnimation(self.fig, self.update_dashboard, init_func=self.init_dashboard,
+                                         interval=round(self.frame_time * 1000), blit=True,
+                                         cache_frame_data=False)
         
         # Control panel
         self.setup_controls()
@@ -304,20 +644,115 @@ class AMRDashboard:
             self.ax_main.add_patch(charging_circle)
             self.ax_main.text(station.x, station.y-3, 'CHARGE', ha='center', fontsize=8)
         
+        # Robots and pending tasks, moved every frame
+        self.robot_circles: List[Circle] = []
+        self.robot_labels = []
+        self.target_lines = []
+        self.task_markers: List[Rectangle] = []
+        self.task_labels = []
+        self._ensure_robot_artists()
+        self._ensure_task_artists(len(self.fleet_manager.task_scheduler.pending_tasks))
+        
         # Battery levels
         self.ax_battery.set_title('Robot Battery Levels', fontweight='bold')
         self.ax_battery.set_xlabel('Robot ID')
         self.ax_battery.set_ylabel('Battery %')
-        self.ax_battery.set_ylim(0, 100)
+        self.ax_battery.set_ylim(0, 110)  # headroom for the percentage labels
+        self.battery_bars = []
+        self.battery_labels = []
+        self._build_battery_bars()
+        self.ax_battery.axhline(y=20, color='red', linestyle='--', alpha=0.8, label='Low Battery')
+        # A fixed spot: 'best' is re-evaluated on every full draw and can move
+        # the legend under the cached blit background
+        self.ax_battery.legend(loc='upper right')
         
-        # Status distribution
+        # Status distribution: one wedge, label and percentage per status,
+        # resized in place whenever the counts change
         self.ax_status.set_title('Fleet Status Distribution', fontweight='bold')
-        
-        # Performance metrics
+        self.ax_status.set(frame_on=False, xticks=[], yticks=[])
+        # Keep the pie round at any window size by widening the data limits,
+        # not shrinking the axes; the extent leaves room for the labels beside
+        # the pie so they stay inside the blitted area
+        self.ax_status.set_aspect('equal', adjustable='datalim')
+        self.ax_status.update_datalim([(-1.8, -1.25), (1.8, 1.25)])
+        self.ax_status.autoscale_view(tight=True)
+        self.status_wedges = []
+        self.status_labels = []
+        self.status_pcts = []
+        for status in ROBOT_STATUSES:
+            wedge = Wedge((0, 0), 1, 90, 90, facecolor=self.status_colors[status],
+                          visible=False, animated=True)
+            self.ax_status.add_patch(wedge)
+            self.status_wedges.append(wedge)
+            self.status_labels.append(self.ax_status.text(0, 0, '', va='center',
+                                                          visible=False, animated=True))
+            self.status_pcts.append(self.ax_status.text(0, 0, '', ha='center', va='center',
+                                                        visible=False, animated=True))
+        
+        # Performance metrics over a fixed window of the last HISTORY_LENGTH frames
         self.ax_metrics.set_title('Fleet Performance Over Time', fontweight='bold')
         self.ax_metrics.set_xlabel('Time (seconds)')
         self.ax_metrics.set_ylabel('Efficiency %')
+        self.ax_metrics.set_xlim(0, self.HISTORY_LENGTH * self.frame_time)
         self.ax_metrics.set_ylim(0, 100)
+        self.ax_metrics.grid(True, alpha=0.3)
+        self.efficiency_line, = self.ax_metrics.plot([], [], 'b-', linewidth=2, animated=True)
+        self.metrics_text = self.ax_metrics.text(0.02, 0.98, '', transform=self.ax_metrics.transAxes,
+                                                 verticalalignment='top', animated=True,
+                                                 bbox=dict(boxstyle='round', facecolor='wheat', alpha=0.8))
+    
+    def _ensure_robot_artists(self):
+        """Create a circle, ID label and target line for robots that have none yet"""
+        for robot in self.fleet_manager.robots[len(self.robot_circles):]:
+            position = robot.position
+            circle = Circle((position.x, position.y), 1, alpha=0.8, animated=True)
+            self.ax_main.add_patch(circle)
+            self.robot_circles.append(circle)
+            
+            self.robot_labels.append(self.ax_main.text(position.x, position.y + 1.5, robot.id,
+                                                       ha='center', fontsize=8, fontweight='bold',
+                                                       animated=True))
+            
+            line, = self.ax_main.plot([], [], '--', alpha=0.5, animated=True)
+            self.target_lines.append(line)
+    
+    def _ensure_task_artists(self, count: int):
+        """Grow the pool of task markers to hold at least `count` pending tasks"""
+        while len(self.task_markers) < count:
+            marker = Rectangle((0, 0), 1, 1, color='red', alpha=0.6, visible=False, animated=True)
+            self.ax_main.add_patch(marker)
+            self.task_markers.append(marker)
+            self.task_labels.append(self.ax_main.text(0, 0, '', ha='center', fontsize=6,
+                                                      visible=False, animated=True))
+    
+    def _build_battery_bars(self):
+        """(Re)create one battery bar and percentage label per robot"""
+        for artist in [*self.battery_bars, *self.battery_labels]:
+            artist.remove()
+        
+        robots = self.fleet_manager.robots
+        self.battery_bars = list(self.ax_battery.bar([robot.id for robot in robots],
+                                                     self.fleet_manager.state.battery,
+                                                     alpha=0.7))
+        self.battery_labels = [
+            self.ax_battery.text(bar.get_x() + bar.get_width()/2., 0, '',
+                                 ha='center', va='bottom', fontsize=8, animated=True)
+            for bar in self.battery_bars
+        ]
+        for bar in self.battery_bars:
+            bar.set_animated(True)
+    
+    def _fleet_artists(self) -> list:
+        return [*self.robot_circles, *self.robot_labels, *self.target_lines,
+                *self.task_markers, *self.task_labels,
+                *self.battery_bars, *self.battery_labels,
+                *self.status_wedges, *self.status_labels, *self.status_pcts]
+    
+    def _metrics_artists(self) -> list:
+        return [self.efficiency_line, self.metrics_text]
+    
+    def _animated_artists(self) -> list:
+        return self._fleet_artists() + self._metrics_artists()
     
     def setup_controls(self):
         """Setup control buttons"""
@@ -338,128 +773,191 @@ class AMRDashboard:
     
     def add_random_task(self, event):
         """Add a random task to the queue"""
-        task = self.fleet_manager.generate_random_task()
-        self.fleet_manager.task_scheduler.add_task(task)
+        self.fleet_manager.add_random_task()
     
     def emergency_stop(self, event):
         """Emergency stop all robots"""
-        for robot in self.fleet_manager.robots:
-            robot.status = RobotStatus.IDLE
-            robot.target_position = None
-            robot.current_task = None
+        self.fleet_manager.emergency_stop()
     
     def update_speed(self, val):
         """Update robot speeds"""
-        for robot in self.fleet_manager.robots:
-            robot.speed = val * 2.0
+        self.fleet_manager.state.speed[:] = val * 2.0
+    
+    def init_dashboard(self):
+        """Initial blit frame: everything animated starts from a clean background"""
+        return self._animated_artists()
     
     def update_dashboard(self, frame):
-        """Update all dashboard components"""
+        """Update all dashboard components and return the artists that changed"""
         # Update fleet simulation
-        self.fleet_manager.update_fleet(0.1)
+        for _ in range(self.STEPS_PER_FRAME):
+            self.fleet_manager.update_fleet(self.SIM_DT)
+        status = self.fleet_manager.get_fleet_status()
         
-        # Clear plots
-        self.ax_main.clear()
-        self.ax_battery.clear()
-        self.ax_status.clear()
+        # The metrics history scrolls every frame; the rest of the dashboard
+        # is only redrawn once something visible has changed
+        if self._fleet_view_changed(status):
+            self._release_fleet_view()
+            self.update_fleet_view()
+            artists = self._animated_artists()
+        else:
+            self._hold_fleet_view()
+            artists = self._metrics_artists()
+        self.update_metrics(frame, status)
         
-        # Redraw static elements
-        self.setup_plots()
+        # Automatically add new tasks occasionally
+        if frame % round(10 / self.frame_time) == 0:  # Every 10 seconds
+            self.add_random_task(None)
         
-        # Draw robots
-        for robot in self.fleet_manager.robots:
-            color = self.status_colors[robot.status]
-            
-            # Robot position
-            robot_circle = Circle((robot.position.x, robot.position.y), 1, 
-                                color=color, alpha=0.8)
-            self.ax_main.add_patch(robot_circle)
-            
-            # Robot ID label
-            self.ax_main.text(robot.position.x, robot.position.y + 1.5, robot.id, 
-                            ha='center', fontsize=8, fontweight='bold')
+        return artists
+    
+    def _on_full_draw(self, event):
+        """Redraw the whole fleet view on the next frame, since a full draw erased it"""
+        self._last_view = None
+        self._fleet_backgrounds = None
+    
+    def _hold_fleet_view(self):
+        """Keep the unchanged fleet artists in the canvas while only the metrics are blitted.
+        
+        Before each frame FuncAnimation restores the backgrounds of every axes
+        drawn in the previous one, so on the first held frame save those clean
+        backgrounds and draw the fleet artists back into the canvas once.
+        Later frames then leave the fleet axes untouched.
+        """
+        if self._fleet_backgrounds is not None:
+            return
+        
+        canvas = self.fig.canvas
+        self._fleet_backgrounds = [canvas.copy_from_bbox(ax.bbox)
+                                   for ax in (self.ax_main, self.ax_battery, self.ax_status)]
+        for artist in self._fleet_artists():
+            artist.axes.draw_artist(artist)
+    
+    def _release_fleet_view(self):
+        """Erase the fleet artists drawn by _hold_fleet_view before they are redrawn"""
+        if self._fleet_backgrounds is None:
+            return
+        
+        for background in self._fleet_backgrounds:
+            self.fig.canvas.restore_region(background)
+        self._fleet_backgrounds = None
+    
+    def _fleet_view_changed(self, status: Dict) -> bool:
+        """Whether statuses, task counts, positions or batteries moved since the last redraw"""
+        state = self.fleet_manager.state
+        signature = (tuple(state.status.tolist()), round(self.fleet_manager.fleet_efficiency, 1),
+                     status['total_tasks_completed'], status['pending_tasks'])
+        
+        if self._last_view is not None:
+            last_signature, last_x, last_y, last_battery = self._last_view
+            if (signature == last_signature
+                    and np.max(np.abs(state.pos_x - last_x), initial=0) < 0.1
+                    and np.max(np.abs(state.pos_y - last_y), initial=0) < 0.1
+                    and np.max(np.abs(state.battery - last_battery), initial=0) < 0.5):
+                return False
+        
+        self._last_view = (signature, state.pos_x.copy(), state.pos_y.copy(), state.battery.copy())
+        return True
+    
+    def update_fleet_view(self):
+        """Move the robot and task artists and refresh the battery bars and status pie"""
+        self._ensure_robot_artists()
+        
+        # Read the fleet straight from its columns rather than through the Robot proxies
+        state = self.fleet_manager.state
+        colors = self.status_rgba[state.status]
+        battery_levels = state.battery.tolist()
+        
+        # Move robots
+        for x, y, target_x, target_y, color, circle, label, line in zip(
+                state.pos_x.tolist(), state.pos_y.tolist(),
+                state.target_x.tolist(), state.target_y.tolist(), colors,
+                self.robot_circles, self.robot_labels, self.target_lines):
+            circle.center = (x, y)
+            circle.set_color(color)
+            label.set_position((x, y + 1.5))
             
             # Target line
-            if robot.target_position:
-                self.ax_main.plot([robot.position.x, robot.target_position.x],
-                                [robot.position.y, robot.target_position.y],
-                                '--', color=color, alpha=0.5)
-        
-        # Draw pending tasks
-        for task in self.fleet_manager.task_scheduler.pending_tasks:
-            task_rect = Rectangle((task.start_pos.x-0.5, task.start_pos.y-0.5), 1, 1,
-                                color='red', alpha=0.6)
-            self.ax_main.add_patch(task_rect)
-            self.ax_main.text(task.start_pos.x, task.start_pos.y-1.5, f'P{task.priority}',
-                            ha='center', fontsize=6)
+            if math.isnan(target_x):
+                line.set_data([], [])
+            else:
+                line.set_data([x, target_x], [y, target_y])
+                line.set_color(color)
+        
+        # Move pending task markers, hiding the unused ones
+        pending_tasks = self.fleet_manager.task_scheduler.get_pending_tasks()
+        self._ensure_task_artists(len(pending_tasks))
+        for i, (marker, label) in enumerate(zip(self.task_markers, self.task_labels)):
+            visible = i < len(pending_tasks)
+            marker.set_visible(visible)
+            label.set_visible(visible)
+            if visible:
+                task = pending_tasks[i]
+                marker.set_xy((task.start_pos.x-0.5, task.start_pos.y-0.5))
+                label.set_position((task.start_pos.x, task.start_pos.y-1.5))
+                label.set_text(f'P{task.priority}')
         
         # Battery levels bar chart
-        robot_ids = [robot.id for robot in self.fleet_manager.robots]
-        battery_levels = [robot.battery_level for robot in self.fleet_manager.robots]
-        colors = [self.status_colors[robot.status] for robot in self.fleet_manager.robots]
-        
-        bars = self.ax_battery.bar(robot_ids, battery_levels, color=colors, alpha=0.7)
-        self.ax_battery.axhline(y=20, color='red', linestyle='--', alpha=0.8, label='Low Battery')
-        self.ax_battery.legend()
-        
-        # Add battery percentage labels on bars
-        for bar, level in zip(bars, battery_levels):
-            height = bar.get_height()
-            self.ax_battery.text(bar.get_x() + bar.get_width()/2., height + 1,
-                               f'{level:.0f}%', ha='center', va='bottom', fontsize=8)
+        if len(self.battery_bars) != len(battery_levels):
+            self._build_battery_bars()
+        for level, color, bar, label in zip(battery_levels, colors, self.battery_bars, self.battery_labels):
+            bar.set_height(level)
+            bar.set_color(color)
+            label.set_y(level + 1)
+            label.set_text(f'{level:.0f}%')
         
         # Status distribution pie chart
         status_counts = self.fleet_manager.get_fleet_status()['status_distribution']
-        labels = []
-        sizes = []
-        colors_pie = []
-        
-        for status, count in status_counts.items():
-            if count > 0:
-                labels.append(f"{status.title()} ({count})")
-                sizes.append(count)
-                colors_pie.append(self.status_colors[RobotStatus(status)])
-        
-        if sizes:
-            self.ax_status.pie(sizes, labels=labels, colors=colors_pie, autopct='%1.1f%%',
-                             startangle=90)
-        
-        # Performance metrics over time
-        current_time = len(self.time_data) * 0.1
+        if tuple(status_counts.values()) != self._last_status_counts:
+            self._last_status_counts = tuple(status_counts.values())
+            self.update_status_pie(status_counts)
+    
+    def update_metrics(self, frame, status: Dict):
+        """Append the current efficiency to the history and refresh the metrics text"""
+        current_time = frame * self.frame_time
         self.time_data.append(current_time)
         self.efficiency_data.append(self.fleet_manager.fleet_efficiency)
         
-        # Keep only last 100 data points
-        if len(self.time_data) > 100:
-            self.time_data.pop(0)
-            self.efficiency_data.pop(0)
-        
-        self.ax_metrics.clear()
-        self.ax_metrics.set_title('Fleet Performance Over Time', fontweight='bold')
-        self.ax_metrics.set_xlabel('Time (seconds)')
-        self.ax_metrics.set_ylabel('Efficiency %')
-        self.ax_metrics.set_ylim(0, 100)
-        self.ax_metrics.plot(self.time_data, self.efficiency_data, 'b-', linewidth=2)
-        self.ax_metrics.grid(True, alpha=0.3)
+        # Plot relative to the oldest sample so the window fits the fixed x axis
+        self.efficiency_line.set_data(np.subtract(self.time_data, self.time_data[0]), self.efficiency_data)
         
         # Add performance text
-        status = self.fleet_manager.get_fleet_status()
-        metrics_text = f"""Tasks Completed: {status['total_tasks_completed']}
+        metrics = (status['total_tasks_completed'], status['pending_tasks'],
+                   status['fleet_efficiency'], status['average_battery'])
+        if metrics != self._last_metrics:
+            self._last_metrics = metrics
+            self.metrics_text.set_text(f"""Tasks Completed: {status['total_tasks_completed']}
 Pending Tasks: {status['pending_tasks']}
 Fleet Efficiency: {status['fleet_efficiency']}%
-Avg Battery: {status['average_battery']}%"""
-        
-        self.ax_metrics.text(0.02, 0.98, metrics_text, transform=self.ax_metrics.transAxes,
-                           verticalalignment='top', bbox=dict(boxstyle='round', facecolor='wheat', alpha=0.8))
-        
-        # Automatically add new tasks occasionally
-        if frame % 100 == 0:  # Every 10 seconds
-            self.add_random_task(None)
-        
-        try:
-            plt.tight_layout()
-        except:
-            pass  # Ignore layout warnings from interactive elements
+Avg Battery: {status['average_battery']}%""")
+    
+    def update_status_pie(self, status_counts: Dict[str, int]):
+        """Resize the status wedges and move their labels to match `status_counts`"""
+        total = sum(status_counts.values())
+        theta = 90.0
+        
+        for status, wedge, label, pct in zip(ROBOT_STATUSES, self.status_wedges,
+                                             self.status_labels, self.status_pcts):
+            count = status_counts[status.value]
+            for artist in (wedge, label, pct):
+                artist.set_visible(count > 0)
+            if count == 0:
+                continue
+            
+            # Same geometry as ax.pie: counterclockwise from 12 o'clock
+            span = 360.0 * count / total
+            wedge.set_theta1(theta)
+            wedge.set_theta2(theta + span)
+            
+            mid = math.radians(theta + span / 2)
+            x, y = math.cos(mid), math.sin(mid)
+            label.set_position((1.1 * x, 1.1 * y))
+            label.set_horizontalalignment('left' if x > 0 else 'right')
+            label.set_text(f"{status.value.title()} ({count})")
+            pct.set_position((0.6 * x, 0.6 * y))
+            pct.set_text(f'{100 * count / total:.1f}%')
+            
+            theta += span
     
     def run(self):
         """Start the dashboard"""
@@ -469,6 +967,9 @@ Avg Battery: {status['average_battery']}%"""
 class AMRControlPanel:
     def __init__(self, fleet_manager: AMRFleetManager):
         self.fleet_manager = fleet_manager
+        # Latest snapshot published by the simulation thread; the panel only
+        # talks to the fleet through its queues
+        self.fleet_status: Optional[Dict] = None
         self.root = tk.Tk()
         self.root.title("AMR Fleet Control Panel")
         self.root.geometry("400x600")
@@ -519,46 +1020,56 @@ class AMRControlPanel:
         self.update_display()
         
     def add_task(self):
-        task = self.fleet_manager.generate_random_task()
-        self.fleet_manager.task_scheduler.add_task(task)
-        messagebox.showinfo("Task Added", f"Added task {task.id} ({task.task_type.value})")
+        self.fleet_manager.cmd_q.put(('add_random_task',))
+        messagebox.showinfo("Task Added", "Random task queued for the fleet")
     
     def emergency_stop(self):
-        for robot in self.fleet_manager.robots:
-            robot.status = RobotStatus.IDLE
-            robot.target_position = None
-            robot.current_task = None
+        self.fleet_manager.cmd_q.put(('emergency_stop',))
         messagebox.showwarning("Emergency Stop", "All robots stopped!")
     
     def resume_operations(self):
         messagebox.showinfo("Resume", "Operations resumed")
     
     def charge_all(self):
-        for robot in self.fleet_manager.robots:
-            if robot.battery_level < 90:
-                robot.status = RobotStatus.CHARGING
-                robot.target_position = None
+        self.fleet_manager.cmd_q.put(('charge_all',))
         messagebox.showinfo("Charging", "All robots sent to charging stations")
     
     def show_robot_info(self):
         robot_id = self.robot_var.get()
-        robot = next((r for r in self.fleet_manager.robots if r.id == robot_id), None)
+        robots = self.fleet_status['robots'] if self.fleet_status else []
+        robot = next((r for r in robots if r['id'] == robot_id), None)
         
         if robot:
-            info = f"""Robot ID: {robot.id}
-Status: {robot.status.value}
-Position: ({robot.position.x:.1f}, {robot.position.y:.1f})
-Battery: {robot.battery_level:.1f}%
-Tasks Completed: {robot.tasks_completed}
-Distance Traveled: {robot.total_distance_traveled:.1f}
-Current Task: {robot.current_task.id if robot.current_task else 'None'}"""
+            x, y = robot['position']
+            info = f"""Robot ID: {robot['id']}
+Status: {robot['status']}
+Position: ({x:.1f}, {y:.1f})
+Battery: {robot['battery']:.1f}%
+Tasks Completed: {robot['tasks_completed']}
+Distance Traveled: {robot['distance']:.1f}
+Current Task: {robot['current_task'] or 'None'}"""
             
             self.robot_info_text.delete(1.0, tk.END)
             self.robot_info_text.insert(1.0, info)
     
     def update_display(self):
-        # Update fleet status
-        status = self.fleet_manager.get_fleet_status()
+        # Update fleet status from the newest published snapshot, if any, and
+        # ask the simulation thread for a fresh one before the next update
+        try:
+            self.fleet_status = self.fleet_manager.status_q.get_nowait()
+        except queue.Empty:
+            pass
+        self.fleet_manager.cmd_q.put(('publish_status',))
+        
+        # Schedule next update
+        self.root.after(1000, self.update_display)
+        
+        status = self.fleet_status
+        if status is None:
+            self.status_text.delete(1.0, tk.END)
+            self.status_text.insert(1.0, "Waiting for fleet status...")
+            return
+        
         status_info = f"""Total Robots: {status['total_robots']}
 Active Tasks: {status['total_tasks_completed']}
 Pending Tasks: {status['pending_tasks']}
@@ -574,13 +1085,10 @@ Status Distribution:"""
         self.status_text.insert(1.0, status_info)
         
         # Update robot combo box
-        robot_ids = [robot.id for robot in self.fleet_manager.robots]
+        robot_ids = [robot['id'] for robot in status['robots']]
         self.robot_combo['values'] = robot_ids
         if robot_ids and not self.robot_var.get():
             self.robot_var.set(robot_ids[0])
-        
-        # Schedule next update
-        self.root.after(1000, self.update_display)
     
     def run(self):
         self.root.mainloop()